@@ -0,0 +1,162 @@
+import os
+import re
+import threading
+from collections.abc import Set
+from random import choice, random
+from time import monotonic
+from typing import Callable, Hashable, Iterable, Iterator, Optional, Union
+
+GAME_WORD_REGEX = r"^[a-z]{5}\n?$"
+
+
+class Corpus(Set):
+    # immutable sorted words of a dictionary, addressable by index
+
+    def __init__(self, words: Iterable[str]):
+        self.words: "tuple[str, ...]" = tuple(sorted(set(words)))
+        self.index: "dict[str, int]" = {w: i for i, w in enumerate(self.words)}
+
+    @classmethod
+    def _from_iterable(cls, it: Iterable[str]) -> "frozenset[str]":
+        # set operations return plain frozensets
+        return frozenset(it)
+
+    def __contains__(self, word: object) -> bool:
+        return word in self.index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.words)
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def __getitem__(self, i: int) -> str:
+        return self.words[i]
+
+    def __reduce__(self):
+        return (Corpus, (self.words,))
+
+    def mask(self, predicate: Callable[[str], bool]) -> int:
+        # bitset of the indices of the words matching predicate
+        return int(
+            "".join("1" if predicate(w) else "0" for w in reversed(self.words)) or "0",
+            2,
+        )
+
+    def subset(self, predicate: Callable[[str], bool]) -> "CorpusView":
+        return CorpusView(self, self.mask(predicate))
+
+    def sample(self, ratio: float) -> "CorpusView":
+        return CorpusView(self, (1 << len(self.words)) - 1).sample(ratio)
+
+
+class CorpusView(Set):
+    # subset of a corpus, stored as a bitset of its indices
+
+    def __init__(self, corpus: Corpus, mask: int):
+        self.corpus = corpus
+        self.mask = mask
+        self.size = bin(mask).count("1")
+
+    @classmethod
+    def _from_iterable(cls, it: Iterable[str]) -> "frozenset[str]":
+        return frozenset(it)
+
+    def __contains__(self, word: object) -> bool:
+        i = self.corpus.index.get(str(word))
+        return i is not None and bool(self.mask >> i & 1)
+
+    def __iter__(self) -> Iterator[str]:
+        words = self.corpus.words
+        for i, bit in enumerate(reversed(bin(self.mask)[2:])):
+            if bit == "1":
+                yield words[i]
+
+    def __len__(self) -> int:
+        return self.size
+
+    def subset(self, predicate: Callable[[str], bool]) -> "CorpusView":
+        return CorpusView(self.corpus, self.mask & self.corpus.mask(predicate))
+
+    def sample(self, ratio: float) -> "CorpusView":
+        # never empty, like wordle.simplify, unless the view is
+        view = self.subset(lambda _: random() < ratio)
+        if view or not self:
+            return view
+        return CorpusView(self.corpus, 1 << self.corpus.index[choice(list(self))])
+
+
+class CorpusRegistry:
+    # Loads each dictionary (file, regexp) once, shared by every caller.
+    #
+    # A dictionary is reloaded when its file changes, the next get returns the
+    # new corpus and the old one is freed once its last user is done with it.
+    # Long running processes only need to call get again to see the change.
+
+    def __init__(self, check_interval: float = 1.0):
+        self.check_interval = check_interval
+        self.lock = threading.Lock()
+        # (file, regexp) -> (mtime, last check, corpus)
+        self.corpora: "dict[tuple[str, str], tuple[float, float, Corpus]]" = {}
+        # derived subsets, for the current corpus of each dictionary only
+        self.subsets: "dict[tuple[str, str, Hashable], CorpusView]" = {}
+
+    def get(self, file: str = "words.txt", regexp: str = GAME_WORD_REGEX) -> Corpus:
+        key = (file, regexp)
+        now = monotonic()
+        with self.lock:
+            entry = self.corpora.get(key)
+            if entry is not None and now - entry[1] < self.check_interval:
+                return entry[2]
+            mtime = os.stat(file).st_mtime
+            if entry is not None and entry[0] == mtime:
+                self.corpora[key] = (mtime, now, entry[2])
+                return entry[2]
+
+            # drop the previous corpus and its subsets before loading the new one
+            self.corpora.pop(key, None)
+            for subset_key in [k for k in self.subsets if k[:2] == key]:
+                del self.subsets[subset_key]
+            corpus = Corpus(load_words(file, regexp))
+            self.corpora[key] = (mtime, now, corpus)
+            return corpus
+
+    def subset(
+        self,
+        name: Hashable,
+        predicate: Callable[[str], bool],
+        file: str = "words.txt",
+        regexp: str = GAME_WORD_REGEX,
+    ) -> CorpusView:
+        # name identifies predicate, e.g. ("nbr_uniq", frozenset({5}))
+        corpus = self.get(file, regexp)
+        key = (file, regexp, name)
+        with self.lock:
+            view = self.subsets.get(key)
+            if view is None or view.corpus is not corpus:
+                view = corpus.subset(predicate)
+                self.subsets[key] = view
+            return view
+
+
+def load_words(file: str, regexp: str) -> "Iterator[str]":
+    with open(file, "r") as f:
+        for line in f:
+            word = line.strip().lower()
+            if re.fullmatch(regexp, word):
+                yield word
+
+
+registry = CorpusRegistry()
+
+
+def init_word_list(
+    regexp: str, nbr_uniq: "Optional[set[int]]" = None, file: str = "words.txt"
+) -> "Union[Corpus, CorpusView]":
+    # shared corpus of file, or view of its words with nbr_uniq distinct letters
+    if nbr_uniq is None:
+        return registry.get(file, regexp)
+    uniq = frozenset(nbr_uniq)
+    return registry.subset(
+        ("nbr_uniq", uniq), lambda w: len(set(w)) in uniq, file, regexp
+    )
@@ -1,26 +1,18 @@
-import re
+import multiprocessing
+import os
 import string
+from collections import defaultdict
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
 from enum import Enum
-from random import choice, random
+from heapq import nlargest
+from itertools import chain, takewhile
+from math import log2
+from random import choice, random, sample
 from sys import argv
-from typing import Iterable, Optional, Tuple
+from typing import Callable, Iterable, NamedTuple, Optional, Sequence, Tuple
 
-GAME_WORD_REGEX = r"^[a-z]{5}\n?$"
-
-
-def init_word_list(
-    regexp: str, nbr_uniq: "Optional[set[int]]" = None, file: str = "words.txt"
-) -> "set[str]":
-    output: "set[str]" = set()
-    with open(file, "r") as f:
-        for line in f:
-            if re.fullmatch(regexp, line.strip().lower()):
-                output.add(line.strip().lower())
-
-    if nbr_uniq is None:
-        return output
-
-    return {w for w in output if len(set(w)) in nbr_uniq}
+from corpus import GAME_WORD_REGEX, init_word_list
+from gamelog import KIND_ELDROW, log_game, pattern_code
 
 
 def is_valid(word: str, hint: str, guess: str) -> bool:
@@ -114,26 +106,158 @@ def eval_guess(
     return output
 
 
+class GuessScore(NamedTuple):
+    worst: int  # size of the biggest bucket
+    expected: float  # expected number of remaining words
+    entropy: float  # in bits
+    singletons: int  # number of buckets with a single word
+
+
+# objectives to minimize, computed from a GuessScore
+OBJECTIVES: "dict[str, Callable[[GuessScore], float]]" = {
+    "worst": lambda score: score.worst,
+    "expected": lambda score: score.expected,
+    "entropy": lambda score: -score.entropy,
+    "singletons": lambda score: -score.singletons,
+}
+
+
+def score_histogram(counts: Iterable[int]) -> GuessScore:
+    sizes = [c for c in counts if c]
+    total = sum(sizes)
+    if not total:
+        return GuessScore(0, 0.0, 0.0, 0)
+    return GuessScore(
+        max(sizes),
+        sum(c * c for c in sizes) / total,
+        -sum(c / total * log2(c / total) for c in sizes),
+        sizes.count(1),
+    )
+
+
+def score_guess(words: "list[str]", guess: str) -> GuessScore:
+    counts: "defaultdict[int, int]" = defaultdict(int)
+    for w in words:
+        counts[pattern_code(guess, w)] += 1
+    return score_histogram(counts.values())
+
+
+def objectives_key(
+    score: GuessScore, objectives: "tuple[str, ...]"
+) -> "tuple[float, ...]":
+    # objectives are compared in order, the next ones break ties
+    return tuple(OBJECTIVES[o](score) for o in objectives)
+
+
+def guess_signature(
+    guess: str, letters: "set[str]", positions: "set[tuple[int, str]]"
+) -> int:
+    # bitmask of the tests the guess makes on the words: presence of a letter,
+    # letter at a given position; guesses making the same tests induce the same
+    # partition of the words, whatever the order or repetition of their letters
+    signature = 0
+    for i, c in enumerate(guess):
+        if c in letters:
+            signature |= 1 << (ord(c) - ord("a"))
+        if (i, c) in positions:
+            signature |= 1 << (26 * (i + 1) + ord(c) - ord("a"))
+    return signature
+
+
+def reduce_guesses(words: "list[str]", guesses: "list[str]") -> "list[str]":
+    # keep one guess per partition of words, and drop guesses whose partition
+    # is refined by another one (they cannot have a smaller biggest bucket)
+    letter_counts: "defaultdict[str, int]" = defaultdict(int)
+    position_counts: "defaultdict[tuple[int, str], int]" = defaultdict(int)
+    for w in words:
+        for c in set(w):
+            letter_counts[c] += 1
+        for i, c in enumerate(w):
+            position_counts[(i, c)] += 1
+    # tests that are true for every word do not split anything
+    letters = {c for c, n in letter_counts.items() if n < len(words)}
+    positions = {p for p, n in position_counts.items() if n < len(words)}
+
+    representatives: "dict[int, str]" = {}
+    for guess in guesses:
+        representatives.setdefault(guess_signature(guess, letters, positions), guess)
+
+    # a signature can only be dominated by one with more bits, so they are
+    # checked by decreasing number of bits against the kept ones sharing their
+    # least common bit
+    kept: "set[int]" = set()
+    kept_by_bit: "defaultdict[int, list[int]]" = defaultdict(list)
+    for signature in sorted(
+        representatives, key=lambda sig: bin(sig).count("1"), reverse=True
+    ):
+        bits: "list[int]" = []
+        rest = signature
+        while rest:
+            bits.append(rest & -rest)
+            rest ^= bits[-1]
+        if bits:
+            candidates = min((kept_by_bit[b] for b in bits), key=len)
+        else:
+            candidates = list(kept)
+        if any(signature | k == k for k in candidates):
+            continue
+        kept.add(signature)
+        for b in bits:
+            kept_by_bit[b].append(signature)
+
+    return [g for sig, g in representatives.items() if sig in kept]
+
+
 def best_guess(
     all_words: "set[str]",
     words: "list[str]",
     max_word_corpus: int = 500,
     max_guess_corpus: int = 2000,
+    verbose: bool = False,
+    objectives: "tuple[str, ...]" = ("worst",),
+    stratified: bool = True,
+    cancelled: "Optional[Callable[[], bool]]" = None,
 ) -> str:
-    word_corpus = simplify(words, max_word_corpus / len(words))
-    # max_guess_corpus = (max_guess_corpus * max_word_corpus) // len(word_corpus)
     max_in_corpus = max_guess_corpus // 2
-    guess_corpus = simplify(word_corpus, max_in_corpus / len(word_corpus))
-    max_out_corpus = max_guess_corpus - len(guess_corpus)
-    guess_corpus.extend(simplify(all_words, max_out_corpus / len(all_words)))
-
-    best_guess = random_guess(words)
+    if stratified:
+        word_corpus = stratified_sample(words, max_word_corpus)
+        guess_corpus = stratified_sample(word_corpus, max_in_corpus)
+        max_out_corpus = max_guess_corpus - len(guess_corpus)
+        guess_corpus.extend(informative_sample(all_words, word_corpus, max_out_corpus))
+    else:
+        word_corpus = simplify(words, max_word_corpus / len(words))
+        # max_guess_corpus = (max_guess_corpus * max_word_corpus) // len(word_corpus)
+        guess_corpus = simplify(word_corpus, max_in_corpus / len(word_corpus))
+        max_out_corpus = max_guess_corpus - len(guess_corpus)
+        guess_corpus.extend(simplify(all_words, max_out_corpus / len(all_words)))
+
+    # the random guess is the first representative of its class, if kept
+    guess_corpus = list(dict.fromkeys([random_guess(words)] + guess_corpus))
+    reduced_corpus = reduce_guesses(word_corpus, guess_corpus)
+    if verbose:
+        print(
+            f"guess corpus reduced from {len(guess_corpus)} to "
+            f"{len(reduced_corpus)} guesses ({len(word_corpus)} words)"
+        )
+
+    guesses: Iterable[str] = reduced_corpus[1:]
+    if cancelled is not None:
+        # a guess that is no longer needed stops early, with the best one so far
+        guesses = takewhile(lambda _: not cancelled(), guesses)
+
+    if objectives != ("worst",):
+        # whole histograms are needed, no early exit
+        return min(
+            chain(reduced_corpus[:1], guesses),
+            key=lambda g: objectives_key(score_guess(word_corpus, g), objectives),
+        )
+
+    best_guess = reduced_corpus[0]
     best_score = eval_guess(word_corpus, best_guess)
     # print(best_guess, eval_guess(words, best_guess))
 
-    guess_corpus = list(set(guess_corpus) - {best_guess})
     # print(len(word_corpus), len(guess_corpus))
-    for guess in guess_corpus:
+    for guess in guesses:
         score = eval_guess(word_corpus, guess, max_score=best_score)
         if score < best_score:
             best_guess = guess
@@ -141,6 +265,64 @@ def best_guess(
     return best_guess
 
 
+class PartitionHistograms:
+    # bucket sizes of the partition of the remaining words by each guess, kept
+    # up to date as the remaining words are narrowed down
+
+    def __init__(self, guesses: "list[str]", words: "list[str]"):
+        self.guesses = guesses
+        self.words: "set[str]" = set(words)
+        self.counts: "list[defaultdict[int, int]]" = []
+        self.worst: "list[int]" = []
+        self.rebuild()
+
+    def rebuild(self) -> None:
+        self.counts = [defaultdict(int) for _ in self.guesses]
+        for guess, counts in zip(self.guesses, self.counts):
+            for w in self.words:
+                counts[pattern_code(guess, w)] += 1
+        self.worst = [max(counts.values(), default=0) for counts in self.counts]
+
+    def remove(self, words: "set[str]") -> None:
+        for i, (guess, counts) in enumerate(zip(self.guesses, self.counts)):
+            worst_changed = False
+            for w in words:
+                code = pattern_code(guess, w)
+                if counts[code] == self.worst[i]:
+                    worst_changed = True
+                counts[code] -= 1
+                if not counts[code]:
+                    del counts[code]
+            if worst_changed:
+                self.worst[i] = max(counts.values(), default=0)
+
+    def narrow(self, words: "list[str]") -> None:
+        # subtract the removed words, or start over from the remaining ones if
+        # there are fewer of them
+        remaining = set(words)
+        removed = self.words - remaining
+        self.words = remaining
+        if len(removed) <= len(remaining):
+            self.remove(removed)
+        else:
+            self.rebuild()
+
+    def best_guess(self, objectives: "tuple[str, ...]" = ("worst",)) -> str:
+        # on ties, a remaining word may be the prey's
+        if objectives == ("worst",):
+            keys: "list[tuple[float, ...]]" = [(w,) for w in self.worst]
+        else:
+            keys = [
+                objectives_key(score_histogram(counts.values()), objectives)
+                for counts in self.counts
+            ]
+        best = min(
+            range(len(self.guesses)),
+            key=lambda i: (keys[i], self.guesses[i] not in self.words),
+        )
+        return self.guesses[best]
+
+
 def simplify(rem_words: Iterable[str], ratio: float) -> "list[str]":
     output: "list[str]" = []
     for w in rem_words:
@@ -149,6 +331,192 @@ def simplify(rem_words: Iterable[str], ratio: float) -> "list[str]":
     return output or [choice(list(rem_words))]
 
 
+def splitting_tests(words: "list[str]", nbr_tests: int) -> "list[tuple[int, str]]":
+    # letter (position -1) and letter at position tests that split words the
+    # most evenly
+    counts: "defaultdict[tuple[int, str], int]" = defaultdict(int)
+    for w in words:
+        for c in set(w):
+            counts[(-1, c)] += 1
+        for i, c in enumerate(w):
+            counts[(i, c)] += 1
+    return sorted(counts, key=lambda t: abs(2 * counts[t] - len(words)))[:nbr_tests]
+
+
+def stratified_sample(
+    words: "list[str]", size: int, nbr_tests: int = 5
+) -> "list[str]":
+    # words are grouped by the outcome of the most splitting tests, each group
+    # gets its share of the sample (at least one word), so that small groups
+    # are not missed
+    if size >= len(words):
+        return list(words)
+    tests = splitting_tests(words, nbr_tests)
+    strata: "defaultdict[tuple[bool, ...], list[str]]" = defaultdict(list)
+    for w in words:
+        strata[tuple(c in w if i < 0 else w[i] == c for i, c in tests)].append(w)
+
+    output: "list[str]" = []
+    for stratum in strata.values():
+        share = size * len(stratum) / len(words)
+        nbr_words = int(share) + (random() < share - int(share))
+        output.extend(sample(stratum, max(1, nbr_words)))
+    return output
+
+
+def informative_sample(
+    all_words: Iterable[str], words: "list[str]", size: int
+) -> "list[str]":
+    # weighted sample of guesses, a letter is worth the entropy of its presence
+    # in words
+    counts: "defaultdict[str, int]" = defaultdict(int)
+    for w in words:
+        for c in set(w):
+            counts[c] += 1
+    letter_weights: "dict[str, float]" = {}
+    for c, n in counts.items():
+        p = n / len(words)
+        letter_weights[c] = -p * log2(p) - (1 - p) * log2(1 - p) if p < 1 else 0.0
+
+    def key(guess: str) -> float:
+        weight = sum(letter_weights.get(c, 0.0) for c in set(guess)) + 1e-3
+        return random() ** (1 / weight)
+
+    return nlargest(size, all_words, key=key)
+
+
+def sampling_agreement(
+    all_words: "set[str]",
+    nbr_trials: int = 20,
+    sizes: "tuple[int, ...]" = (25, 50, 100, 200, 500),
+) -> None:
+    # compare the sampled best guesses with exhaustive scoring on the remaining
+    # words after a random first round
+    corpus = sorted(all_words)
+    print("words  sampling    agreement  mean score (exhaustive)")
+    results: "dict[tuple[int, bool], list[float]]" = defaultdict(list)
+    exhaustive: "list[int]" = []
+    for _ in range(nbr_trials):
+        guess, target = choice(corpus), choice(corpus)
+        hint = get_hint(guess, target)
+        words = [w for w in corpus if w != target and is_valid(w, hint, guess)]
+        if len(words) < 2:
+            continue
+        best_score = len(words)
+        for g in corpus:
+            best_score = min(best_score, eval_guess(words, g, max_score=best_score))
+        exhaustive.append(best_score)
+        for size in sizes:
+            for stratified in (False, True):
+                g = best_guess(all_words, words, size, 4 * size, stratified=stratified)
+                results[(size, stratified)].append(eval_guess(words, g))
+
+    mean_exhaustive = sum(exhaustive) / max(len(exhaustive), 1)
+    for (size, stratified), scores in sorted(results.items()):
+        agreement = sum(s == e for s, e in zip(scores, exhaustive)) / len(scores)
+        print(
+            f"{size:5}  {'stratified' if stratified else 'uniform':10}  "
+            f"{agreement:9.0%}  {sum(scores) / len(scores):.1f} "
+            f"({mean_exhaustive:.1f})"
+        )
+
+
+# corpus of the speculative workers, set once by init_speculation_worker so it
+# is not pickled along with every task
+speculation_words: "set[str]" = set()
+# shared with play: [first live task id, id of the kept task], the tasks before
+# the first live one are stale unless they are the kept one
+speculation_live: "Optional[Sequence[int]]" = None
+
+
+def init_speculation_worker(all_words: "set[str]", live: "Sequence[int]") -> None:
+    global speculation_words, speculation_live
+    speculation_words = all_words
+    speculation_live = live
+
+
+# guess computed by a speculation worker, with the histograms of its bucket
+SpeculatedGuess = Tuple[str, Optional[PartitionHistograms]]
+
+
+def speculation_cancelled(task_id: int) -> bool:
+    # play sets the kept task before moving the first live one
+    return (
+        speculation_live is not None
+        and task_id < speculation_live[0]
+        and task_id != speculation_live[1]
+    )
+
+
+def speculative_best_guess(
+    task_id: int,
+    words: "list[str]",
+    objectives: "tuple[str, ...]",
+    max_guess_corpus: int,
+    max_histogram_work: int,
+) -> SpeculatedGuess:
+    # small enough buckets get their partition histograms, so that the next
+    # rounds only have to narrow them (the prey's word leaves the bucket)
+    if (len(words) - 1) * max_guess_corpus > max_histogram_work:
+        guess = best_guess(
+            speculation_words,
+            words,
+            objectives=objectives,
+            cancelled=lambda: speculation_cancelled(task_id),
+        )
+        return guess, None
+    if speculation_cancelled(task_id):
+        return words[0], None
+    guesses = words + simplify(
+        speculation_words, max_guess_corpus / len(speculation_words)
+    )
+    histograms = PartitionHistograms(list(dict.fromkeys(guesses)), words)
+    return histograms.best_guess(objectives), histograms
+
+
+def hint_buckets(words: "list[str]", guess: str) -> "dict[str, list[str]]":
+    buckets: "defaultdict[str, list[str]]" = defaultdict(list)
+    for w in words:
+        buckets[get_hint(guess, w)].append(w)
+    return buckets
+
+
+def speculate(
+    executor: Executor,
+    words: "list[str]",
+    guess: str,
+    max_tasks: int,
+    first_task_id: int,
+    objectives: "tuple[str, ...]" = ("worst",),
+    max_guess_corpus: int = 2000,
+    max_histogram_work: int = 500_000,
+) -> "dict[str, tuple[int, Future[SpeculatedGuess]]]":
+    # start computing the next guess for the most likely hints, biggest buckets
+    # first, while the prey is still choosing its word
+    # the prey's word will also be removed from the actual remaining words, but
+    # a single word hardly changes the (sampled) best guess of a bucket, and it
+    # is subtracted from the histograms
+    buckets = sorted(
+        hint_buckets(words, guess).items(), key=lambda kv: len(kv[1]), reverse=True
+    )
+    # tasks are numbered from first_task_id, so that they can be cancelled once
+    # running
+    return {
+        hint: (
+            first_task_id + i,
+            executor.submit(
+                speculative_best_guess,
+                first_task_id + i,
+                bucket,
+                objectives,
+                max_guess_corpus,
+                max_histogram_work,
+            ),
+        )
+        for i, (hint, bucket) in enumerate(buckets[:max_tasks])
+    }
+
+
 class Difficulty(Enum):
     EASY = 0
     NORMAL = 1
@@ -219,7 +587,35 @@ def print_explanations(
 def play(
     all_words: "set[str]",
     max_len: int,
+    speculation_workers: Optional[int] = None,
+    log_file: Optional[str] = None,
+    max_guess_corpus: int = 2000,
+    max_histogram_work: int = 500_000,
+    objectives: "tuple[str, ...]" = ("worst",),
 ):
+    # speculation_workers: number of background processes computing the next
+    # guess while the prey is typing (None: one per cpu, at most 4, 0: no
+    # speculation), each one has its copy of the corpus
+    # objectives: names in OBJECTIVES, the hunter minimizes them in order
+    # once there are few enough remaining words (remaining words x guesses <=
+    # max_histogram_work), their partitions are computed for a fixed set of
+    # guesses, by the speculation worker of their hint if any, and then only
+    # updated after each hint
+    if speculation_workers is None:
+        speculation_workers = min(os.cpu_count() or 1, 4)
+    executor: Optional[Executor] = None
+    live_speculations = multiprocessing.Array("q", [0, -1])
+    next_task_id = 0
+    if speculation_workers > 0:
+        executor = ProcessPoolExecutor(
+            speculation_workers,
+            initializer=init_speculation_worker,
+            initargs=(all_words, live_speculations),
+        )
+    speculations: "dict[str, tuple[int, Future[SpeculatedGuess]]]" = {}
+    next_guess: "Optional[Future[SpeculatedGuess]]" = None
+    histograms: Optional[PartitionHistograms] = None
+
     remaining_words: "list[str]" = list(all_words)
     guessed_letters: "set[str]" = set()
     eliminated_letters: "set[str]" = set()
@@ -236,122 +632,194 @@ def play(
 
     lives = 3
 
-    while True:
-        # assert len(remaining_words) > 0
-        if len(game_rounds) > 3:
-            print("You managed to escape!")
-            break
-        if len(remaining_words) == 0:
-            print(f"There is nowhere to run! You get caught!")
-            print_explanations(
-                all_words, game_rounds, guessed_letters, eliminated_letters
-            )
-            break
-        if len(game_rounds) == 3 and len(remaining_words) > 1:
-            print("You managed to escape!")
-            print("You still could have played any of:", remaining_words)
-            break
-
-        # if len(game_rounds) == 2:
-        #     print(remaining_words)
-        if len(game_rounds) == 3 and len(remaining_words) == 1:
-            print("Only one hiding place left...")
-            guess = "?" * max_len
-        # elif len(game_rounds) == 0:
-        #     guess = "rates"
-        else:
-            guess = best_guess(all_words, remaining_words)
-        prompt = f"Guess {nbr_guesses}:"
-        if len(prompt) < prompt_length:
-            prompt += " " * (prompt_length - len(prompt))
-        print(prompt, guess)
-
-        prompt = f"Your word ({len(remaining_words)}):"
-        if len(prompt) < prompt_length:
-            prompt += " " * (prompt_length - len(prompt) - 3)
-        hint_word = ""
-        while not hint_word and lives > 0:
-            hint_word = input(f"({lives}) {prompt}").strip()
-            if hint_word.endswith("!!!"):
+    try:
+        while True:
+            # assert len(remaining_words) > 0
+            if len(game_rounds) > 3:
+                print("You managed to escape!")
+                break
+            if len(remaining_words) == 0:
+                print(f"There is nowhere to run! You get caught!")
+                print_explanations(
+                    all_words, game_rounds, guessed_letters, eliminated_letters
+                )
                 break
-            elif hint_word not in all_words:
-                print("Invalid word: not a word.")
-                lives -= 1
-                hint_word = ""
-            elif hint_word in used_words:
-                print(
-                    f"Invalid word: already played on round {used_words.index(hint_word)}."
+            if len(game_rounds) == 3 and len(remaining_words) > 1:
+                print("You managed to escape!")
+                print("You still could have played any of:", remaining_words)
+                break
+
+            # if len(game_rounds) == 2:
+            #     print(remaining_words)
+            if len(game_rounds) == 3 and len(remaining_words) == 1:
+                print("Only one hiding place left...")
+                guess = "?" * max_len
+            # elif len(game_rounds) == 0:
+            #     guess = "rates"
+            elif histograms is not None:
+                guess = histograms.best_guess(objectives)
+            elif next_guess is not None:
+                guess, histograms = next_guess.result()
+                if histograms is not None:
+                    histograms.narrow(remaining_words)
+                    guess = histograms.best_guess(objectives)
+            else:
+                guess = best_guess(all_words, remaining_words, objectives=objectives)
+            next_guess = None
+            prompt = f"Guess {nbr_guesses}:"
+            if len(prompt) < prompt_length:
+                prompt += " " * (prompt_length - len(prompt))
+            print(prompt, guess)
+
+            # no guess is needed after round 3
+            if executor is not None and histograms is None and len(game_rounds) < 2:
+                speculations = speculate(
+                    executor,
+                    remaining_words,
+                    guess,
+                    # no queued task, stale ones are only the running ones
+                    speculation_workers,
+                    next_task_id,
+                    objectives,
+                    max_guess_corpus,
+                    max_histogram_work,
                 )
-                lives -= 1
-                hint_word = ""
-            elif hint_word not in remaining_words:
-                for i, (g, w, h) in enumerate(game_rounds):
-                    if get_hint(g, hint_word) == h:
-                        continue
+                next_task_id += speculation_workers
+
+            prompt = f"Your word ({len(remaining_words)}):"
+            if len(prompt) < prompt_length:
+                prompt += " " * (prompt_length - len(prompt) - 3)
+            hint_word = ""
+            while not hint_word and lives > 0:
+                hint_word = input(f"({lives}) {prompt}").strip()
+                if hint_word.endswith("!!!"):
+                    break
+                elif hint_word not in all_words:
+                    print("Invalid word: not a word.")
+                    lives -= 1
+                    hint_word = ""
+                elif hint_word in used_words:
                     print(
-                        f"Invalid word: incompatible with round {i}.\n"
-                        f"\t{g} {g}\n"
-                        f"\t{w} {hint_word}\n"
-                        f"\t{h} {get_hint(g, hint_word)}"
+                        "Invalid word: already played on round "
+                        f"{used_words.index(hint_word)}."
                     )
                     lives -= 1
                     hint_word = ""
-                    break
-
-        if lives == 0:
-            print("Too many mistakes! You get caught!")
-            if len(remaining_words) > 5:
-                remaining_words[4] = "..."
-            print("You could have played any of:", remaining_words[:5])
-            break
+                elif hint_word not in remaining_words:
+                    for i, (g, w, h) in enumerate(game_rounds):
+                        if get_hint(g, hint_word) == h:
+                            continue
+                        print(
+                            f"Invalid word: incompatible with round {i}.\n"
+                            f"\t{g} {g}\n"
+                            f"\t{w} {hint_word}\n"
+                            f"\t{h} {get_hint(g, hint_word)}"
+                        )
+                        lives -= 1
+                        hint_word = ""
+                        break
+
+            if lives == 0:
+                print("Too many mistakes! You get caught!")
+                if len(remaining_words) > 5:
+                    remaining_words[4] = "..."
+                print("You could have played any of:", remaining_words[:5])
+                break
 
-        if hint_word.endswith("!!!"):
-            hint = hint_word[:-3]
-            hint_word = hint
-        else:
-            hint = get_hint(guess, hint_word)
-        nbr_guesses += 1
-
-        remaining_words = [w for w in remaining_words if w != hint_word]
-        used_words.append(hint_word)
-        game_rounds.append((guess, hint_word, hint))
-        if not guess.startswith("?"):
-            print(" " * prompt_length, hint)
-        print()
-        for i, c in enumerate(hint):
-            untested_letters.discard(guess[i])
-            if c == ".":
-                eliminated_letters.add(guess[i])
-                continue
-            if c.lower() not in guessed_letters:
-                guessed_letters.add(c.lower())
-                for index, s in enumerate(known_letters_pos):
-                    if mask[index] == "-":
-                        s.add(c.lower())
-            if c.isupper():
-                mask[i] = c
-                known_letters_pos[i] = {c}
+            if hint_word.endswith("!!!"):
+                hint = hint_word[:-3]
+                hint_word = hint
             else:
-                known_letters_pos[i].discard(c.lower())
-            if len(guessed_letters) == len(mask):
-                for k in mask:
-                    if k == "-":
-                        continue
-                    for s in known_letters_pos:
-                        s.discard(k.lower())
-
-        # print(sorted(untested_letters))
-        # print(sorted(eliminated_letters))
-        # print(known_letters_pos)
-        # print("".join(mask), sorted(guessed_letters))
+                hint = get_hint(guess, hint_word)
+            nbr_guesses += 1
+
+            kept = speculations.pop(hint, None)
+            if kept is not None:
+                live_speculations[1], next_guess = kept
+            # the other speculations stop at their next guess
+            live_speculations[0] = next_task_id
+            for _, speculation in speculations.values():
+                speculation.cancel()
+            speculations = {}
+
+            remaining_words = [w for w in remaining_words if w != hint_word]
+            used_words.append(hint_word)
+            game_rounds.append((guess, hint_word, hint))
+            if not guess.startswith("?"):
+                print(" " * prompt_length, hint)
+            print()
+            for i, c in enumerate(hint):
+                untested_letters.discard(guess[i])
+                if c == ".":
+                    eliminated_letters.add(guess[i])
+                    continue
+                if c.lower() not in guessed_letters:
+                    guessed_letters.add(c.lower())
+                    for index, s in enumerate(known_letters_pos):
+                        if mask[index] == "-":
+                            s.add(c.lower())
+                if c.isupper():
+                    mask[i] = c
+                    known_letters_pos[i] = {c}
+                else:
+                    known_letters_pos[i].discard(c.lower())
+                if len(guessed_letters) == len(mask):
+                    for k in mask:
+                        if k == "-":
+                            continue
+                        for s in known_letters_pos:
+                            s.discard(k.lower())
+
+            # print(sorted(untested_letters))
+            # print(sorted(eliminated_letters))
+            # print(known_letters_pos)
+            # print("".join(mask), sorted(guessed_letters))
+
+            remaining_words = [w for w in remaining_words if is_valid(w, hint, guess)]
+            # no guess is needed after round 3
+            if histograms is not None and len(game_rounds) < 3:
+                histograms.narrow(remaining_words)
+            elif (
+                # a speculated guess this small comes with its histograms
+                next_guess is None
+                and remaining_words
+                and len(game_rounds) < 3
+                and len(remaining_words) * max_guess_corpus <= max_histogram_work
+            ):
+                guesses = remaining_words + simplify(
+                    all_words, max_guess_corpus / len(all_words)
+                )
+                histograms = PartitionHistograms(
+                    list(dict.fromkeys(guesses)), remaining_words
+                )
+            # print(len(remaining_words))
+            # if len(remaining_words) < 5:
+            #     print(remaining_words)
+    finally:
+        if executor is not None:
+            # running speculations cannot be interrupted, do not wait for them
+            executor.shutdown(wait=False, cancel_futures=True)
 
-        remaining_words = [w for w in remaining_words if is_valid(w, hint, guess)]
-        # print(len(remaining_words))
-        # if len(remaining_words) < 5:
-        #     print(remaining_words)
+    if log_file is not None:
+        try:
+            log_game(log_file, sorted(all_words), KIND_ELDROW, game_rounds)
+        except (OSError, ValueError) as e:
+            print(f"Game not logged in {log_file}: {e}")
 
 
 if __name__ == "__main__":
 
+    if len(argv) > 1 and argv[1] == "sampling":
+        sampling_agreement(init_word_list(GAME_WORD_REGEX))
+        exit(0)
+
+    # e.g. python3 eldrow.py expected,worst
+    objectives: "tuple[str, ...]" = ("worst",)
+    if len(argv) > 1:
+        objectives = tuple(argv[1].split(","))
+        if not set(objectives) <= OBJECTIVES.keys():
+            print(f"objectives must be in {list(OBJECTIVES)}")
+            exit(1)
+
     all_words = init_word_list(GAME_WORD_REGEX)
-    play(all_words, 5)
+    play(all_words, 5, log_file="games.log", objectives=objectives)
@@ -0,0 +1,235 @@
+import os
+import struct
+import zlib
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from sys import argv
+from typing import BinaryIO, Iterable, Iterator, Optional
+
+# Append-only log of played games.
+#
+# The file starts with a header identifying the corpus the words are indexed
+# in (sorted corpus, crc32 of its words), then contains one record per game:
+#   game kind (byte), number of rounds (byte),
+#   then for each round: guess index, word index (uint16), hint code (byte)
+# Words that are not in the corpus (eldrow bonus round "?????", hints given
+# with "!!!", unknown wordle target) are stored as NO_WORD.
+
+LOG_MAGIC = b"ELDL"
+LOG_VERSION = 1
+HEADER = struct.Struct("<4sBII")
+GAME = struct.Struct("<BB")
+ROUND = struct.Struct("<HHB")
+NO_WORD = 0xFFFF
+
+KIND_ELDROW = 0
+# wordle games are logged as KIND_WORDLE + Difficulty.value
+KIND_WORDLE = 1
+KIND_NAMES = {0: "eldrow", 1: "wordle easy", 2: "wordle normal", 3: "wordle cursed"}
+
+
+def encode_hint(hint: str) -> int:
+    # base 3 pattern code, first letter most significant: "." 0, lower 1, upper 2
+    code = 0
+    for c in hint:
+        code = 3 * code + (0 if c == "." else 2 if c.isupper() else 1)
+    return code
+
+
+def pattern_code(guess: str, word: str) -> int:
+    # encode_hint of the hint of guess for word, without building the hint
+    code = 0
+    for g, w in zip(guess, word):
+        code = 3 * code + (2 if g == w else 1 if g in word else 0)
+    return code
+
+
+def decode_hint(code: int, guess: str) -> str:
+    output = ""
+    for c in reversed(guess):
+        code, digit = divmod(code, 3)
+        output = (".", c.lower(), c.upper())[digit] + output
+    return output
+
+
+def corpus_checksum(corpus: "list[str]") -> int:
+    return zlib.crc32("\n".join(corpus).encode())
+
+
+def write_header(f: BinaryIO, corpus: "list[str]") -> None:
+    if len(corpus) >= NO_WORD:
+        raise ValueError(f"corpus too big to be logged: {len(corpus)} words")
+    f.write(HEADER.pack(LOG_MAGIC, LOG_VERSION, len(corpus), corpus_checksum(corpus)))
+
+
+def read_header(f: BinaryIO, corpus: "list[str]") -> None:
+    data = f.read(HEADER.size)
+    if len(data) < HEADER.size:
+        raise ValueError("truncated game log header")
+    magic, version, size, checksum = HEADER.unpack(data)
+    if magic != LOG_MAGIC or version != LOG_VERSION:
+        raise ValueError("not a game log")
+    if size != len(corpus) or checksum != corpus_checksum(corpus):
+        raise ValueError("game log was written with a different corpus")
+
+
+def log_game(
+    file: str,
+    corpus: "list[str]",
+    kind: int,
+    game_rounds: "list[tuple[str,str,str]]",
+    index: "Optional[dict[str, int]]" = None,
+) -> None:
+    # corpus must be sorted, index maps its words to their position in it
+    # raises ValueError if the game cannot be logged in file
+    if index is None:
+        index = {w: i for i, w in enumerate(corpus)}
+    record = GAME.pack(kind, len(game_rounds))
+    for guess, word, hint in game_rounds:
+        # e.g. a partial or too long hint given with "!!!" in eldrow
+        if len(hint) != len(guess) or len(guess) != 5:
+            raise ValueError(f"hint {hint!r} of guess {guess!r} cannot be logged")
+        record += ROUND.pack(
+            index.get(guess, NO_WORD), index.get(word, NO_WORD), encode_hint(hint)
+        )
+
+    with open(file, "ab") as f:
+        if f.tell() == 0:
+            write_header(f, corpus)
+        else:
+            with open(file, "rb") as check:
+                read_header(check, corpus)
+        f.write(record)
+
+
+def read_games(
+    file: str, corpus: "list[str]"
+) -> "Iterator[tuple[int, list[tuple[str,str,str]]]]":
+    # stream (kind, game_rounds) without loading the whole log
+    with open(file, "rb") as f:
+        read_header(f, corpus)
+        while True:
+            data = f.read(GAME.size)
+            if len(data) < GAME.size:
+                return
+            kind, nbr_rounds = GAME.unpack(data)
+            data = f.read(ROUND.size * nbr_rounds)
+            if len(data) < ROUND.size * nbr_rounds:
+                return
+            game_rounds: "list[tuple[str,str,str]]" = []
+            for guess_index, word_index, code in ROUND.iter_unpack(data):
+                guess = corpus[guess_index] if guess_index != NO_WORD else "?" * 5
+                word = corpus[word_index] if word_index != NO_WORD else ""
+                game_rounds.append((guess, word, decode_hint(code, guess)))
+            yield kind, game_rounds
+
+
+# corpus of the replay workers, set once by init_replay_worker
+replay_words: "set[str]" = set()
+
+
+def init_replay_worker(corpus: "list[str]") -> None:
+    global replay_words
+    replay_words = set(corpus)
+
+
+def rescore_eldrow(game_rounds: "list[tuple[str,str,str]]") -> "list[int]":
+    # logged and current hunter worst case buckets, summed over the game
+    from eldrow import best_guess, eval_guess, is_valid
+
+    logged = 0
+    current = 0
+    nbr_guesses = 0
+    remaining_words = list(replay_words)
+    for guess, word, hint in game_rounds:
+        if not remaining_words or guess.startswith("?"):
+            break
+        logged += eval_guess(remaining_words, guess)
+        current_guess = best_guess(replay_words, remaining_words)
+        current += eval_guess(remaining_words, current_guess)
+        nbr_guesses += 1
+        remaining_words = [
+            w for w in remaining_words if w != word and is_valid(w, hint, guess)
+        ]
+    return [nbr_guesses, logged, current]
+
+
+def rescore_chunk(
+    games: "list[tuple[int, list[tuple[str,str,str]]]]",
+) -> "dict[int, list[int]]":
+    # sums per game kind: [games, rounds, logged score, current score], only
+    # eldrow games are rescored
+    totals: "dict[int, list[int]]" = {}
+    for kind, game_rounds in games:
+        if kind == KIND_ELDROW:
+            scores = rescore_eldrow(game_rounds)
+        else:
+            # the target words and the min_hints of a wordle game are not
+            # logged, the current adversary would not play the same game
+            scores = [len(game_rounds), 0, 0]
+        total = totals.setdefault(kind, [0, 0, 0, 0])
+        total[0] += 1
+        for i, s in enumerate(scores):
+            total[i + 1] += s
+    return totals
+
+
+def chunks(iterable: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def replay(
+    file: str,
+    corpus: "list[str]",
+    chunk_size: int = 256,
+    workers: Optional[int] = None,
+) -> "dict[int, list[int]]":
+    if workers is None:
+        workers = os.cpu_count() or 1
+    totals: "dict[int, list[int]]" = {}
+
+    def merge(future: "Future[dict[int, list[int]]]") -> None:
+        for kind, sums in future.result().items():
+            total = totals.setdefault(kind, [0, 0, 0, 0])
+            for i, s in enumerate(sums):
+                total[i] += s
+
+    with ProcessPoolExecutor(
+        workers, initializer=init_replay_worker, initargs=(corpus,)
+    ) as executor:
+        # keep a bounded number of chunks in flight, the log is never fully
+        # loaded in memory
+        pending: "list[Future[dict[int, list[int]]]]" = []
+        for chunk in chunks(read_games(file, corpus), chunk_size):
+            pending.append(executor.submit(rescore_chunk, chunk))
+            if len(pending) >= 2 * workers:
+                merge(pending.pop(0))
+        for future in pending:
+            merge(future)
+    return totals
+
+
+if __name__ == "__main__":
+    from corpus import GAME_WORD_REGEX, init_word_list
+
+    if len(argv) < 2:
+        print(f"usage: python3 {argv[0]} <game log> [chunk size] [workers]")
+        exit(1)
+
+    corpus = sorted(init_word_list(GAME_WORD_REGEX))
+    chunk_size = int(argv[2]) if len(argv) > 2 else 256
+    workers = int(argv[3]) if len(argv) > 3 else None
+
+    for kind, (nbr_games, nbr_rounds, logged, current) in sorted(
+        replay(argv[1], corpus, chunk_size, workers).items()
+    ):
+        games = f"{KIND_NAMES.get(kind, kind)}: {nbr_games} games, {nbr_rounds} rounds"
+        if kind != KIND_ELDROW:
+            print(f"{games}, not rescored (target words are not logged)")
+            continue
+        print(
+            f"{games}, mean worst case bucket {logged / max(nbr_rounds, 1):.1f} "
+            f"(logged) {current / max(nbr_rounds, 1):.1f} (current)"
+        )
@@ -1,26 +1,23 @@
+import os
 import re
 import string
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from enum import Enum
 from functools import lru_cache
 from random import choice, random
 from sys import argv
 from typing import Optional
 
-GAME_WORD_REGEX = r"^[a-z]{5}\n?$"
+from corpus import GAME_WORD_REGEX, Corpus, registry
 
 
 def normalize_word(w: str, sorted_chars: str) -> str:
     return "".join(sorted(set(w), key=lambda w: tuple(sorted_chars.find(c) for c in w)))
 
 
-def init_words(regexp: str, file: str = "words.txt") -> "set[str]":
-    words: "set[str]" = set()
-    with open(file, "r") as f:
-        for line in f:
-            if re.fullmatch(regexp, line.strip().lower()):
-                words.add(line.strip().lower())
-    return words
+def init_words(regexp: str, file: str = "words.txt") -> Corpus:
+    return registry.get(file, regexp)
 
 
 def init_word_dict(words: "set[str]", sorted_chars: str) -> "defaultdict[str,set[str]]":
@@ -79,68 +76,178 @@ def get_candidates(
     return output
 
 
-if __name__ == "__main__":
-    all_words = init_words(GAME_WORD_REGEX)
-
+def init_search(
+    all_words: "set[str]",
+) -> "tuple[str, defaultdict[str,set[str]], list[str], set[str], set[str]]":
+    # returns sorted_chars, word_dict, search_keys, relaxed_search_keys, rare_chars
     counts: "dict[str,int]" = {c: 0 for c in string.ascii_lowercase}
     for k in all_words:
         for c in set(k):
             counts[c] += 1
 
-    sorted_chars = sorted(counts.keys(), key=lambda k: counts[k], reverse=True)
+    sorted_chars = "".join(sorted(counts.keys(), key=lambda k: counts[k], reverse=True))
     rare_chars = set(sorted_chars[-2:])
-    print(sorted_chars)
-
-    sorted_chars = "".join(sorted_chars)
     word_dict = init_word_dict(all_words, sorted_chars)
 
-    vowels = set("aeiou")
-    rare_words = {w for k, wl in word_dict.items() for w in wl if not set(k) & vowels}
-    print(rare_words)
-
     order = lambda w: (len(w), *tuple(sorted_chars.find(c) for c in w))
 
     search_keys = sorted(
         {k for k in word_dict if len(k) == 5 and not set(k) & rare_chars}, key=order
     )
-    print(len(search_keys))
     relaxed_search_keys = {
         k for k in word_dict if len(k) > 3 and not set(k) & rare_chars
     }
+    return sorted_chars, word_dict, search_keys, relaxed_search_keys, rare_chars
+
+
+def search_covers(
+    word_dict: "defaultdict[str,set[str]]",
+    search_keys: "list[str]",
+    rare_chars: "set[str]",
+    word0: str,
+) -> "list[str]":
+    if len(word0) == 4:
+        candidates: "list[str]" = get_candidates(
+            word_dict,
+            [w for w in search_keys if not set(w) & set(word0)],
+            "".join(
+                c
+                for c in string.ascii_lowercase
+                if c not in rare_chars and c not in word0
+            ),
+        )
+    else:
+        assert len(word0) == 5
+        candidates = []
+        for i in range(5):
+            forbidden_chars = "".join(c for c in word0 if c != word0[i])
+            candidates.extend(
+                get_candidates(
+                    word_dict,
+                    [w for w in search_keys if not set(w) & set(forbidden_chars)],
+                    "".join(
+                        c
+                        for c in string.ascii_lowercase
+                        if c not in rare_chars and c not in forbidden_chars
+                    ),
+                ),
+            )
+
+    return [f"{word_dict[word0]} {candidate}" for candidate in candidates]
+
+
+def shard_keys(keys: "set[str]", shard: int, nbr_shards: int) -> "list[str]":
+    # deterministic as long as words.txt does not change
+    return sorted(keys)[shard::nbr_shards]
+
+
+def shard_file(output_dir: str, shard: int, nbr_shards: int) -> str:
+    return os.path.join(output_dir, f"covers-{shard:03}-of-{nbr_shards:03}.txt")
+
+
+# search state of the shard workers, set once by init_shard_worker
+shard_state: "tuple[defaultdict[str,set[str]], list[str], set[str], set[str]]"
+
+
+def init_shard_worker(file: str) -> None:
+    global shard_state
+    _, word_dict, search_keys, relaxed_search_keys, rare_chars = init_search(
+        init_words(GAME_WORD_REGEX, file)
+    )
+    shard_state = word_dict, search_keys, relaxed_search_keys, rare_chars
+
+
+def run_shard(shard: int, nbr_shards: int, output_dir: str) -> str:
+    word_dict, search_keys, relaxed_search_keys, rare_chars = shard_state
+    file = shard_file(output_dir, shard, nbr_shards)
+    # written under a temporary name, so that a complete file is a done shard
+    with open(file + ".tmp", "w") as f:
+        for word0 in shard_keys(relaxed_search_keys, shard, nbr_shards):
+            for cover in search_covers(word_dict, search_keys, rare_chars, word0):
+                print(cover, file=f)
+    os.replace(file + ".tmp", file)
+    return file
+
+
+def run_shards(
+    shards: "list[int]",
+    nbr_shards: int,
+    output_dir: str = ".",
+    workers: Optional[int] = None,
+    file: str = "words.txt",
+) -> None:
+    os.makedirs(output_dir, exist_ok=True)
+    with ProcessPoolExecutor(
+        workers, initializer=init_shard_worker, initargs=(file,)
+    ) as executor:
+        futures = [
+            executor.submit(run_shard, shard, nbr_shards, output_dir)
+            for shard in shards
+            if not os.path.exists(shard_file(output_dir, shard, nbr_shards))
+        ]
+        for future in as_completed(futures):
+            print(future.result())
+
+
+def merge_covers(files: "list[str]") -> "list[str]":
+    # covers using the same words in another order are the same cover
+    output: "dict[frozenset[frozenset[str]], str]" = {}
+    for file in files:
+        with open(file, "r") as f:
+            for line in f:
+                groups = [
+                    sorted(re.findall(r"'([a-z]+)'", g))
+                    for g in re.findall(r"\{[^}]*\}", line)
+                ]
+                # skip what is not a cover (e.g. the other prints of search.py)
+                if len(groups) < 2:
+                    continue
+                key = frozenset(frozenset(g) for g in groups)
+                cover = " ".join("{" + ", ".join(map(repr, g)) + "}" for g in groups)
+                # the same representative whatever the order of the files
+                if key not in output or cover < output[key]:
+                    output[key] = cover
+    return sorted(output.values())
+
+
+if __name__ == "__main__":
+    # python3 search.py shards <nbr shards> [workers] [output dir]
+    # python3 search.py shard <shard> <nbr shards> [output dir] (one machine)
+    # python3 search.py merge <covers file>...
+    if len(argv) > 2 and argv[1] == "shards":
+        nbr_shards = int(argv[2])
+        workers = int(argv[3]) if len(argv) > 3 else None
+        output_dir = argv[4] if len(argv) > 4 else "."
+        run_shards(list(range(nbr_shards)), nbr_shards, output_dir, workers)
+        exit(0)
+    if len(argv) > 3 and argv[1] == "shard":
+        output_dir = argv[4] if len(argv) > 4 else "."
+        run_shards([int(argv[2])], int(argv[3]), output_dir, 1)
+        exit(0)
+    if len(argv) > 2 and argv[1] == "merge":
+        for cover in merge_covers(argv[2:]):
+            print(cover)
+        exit(0)
+
+    all_words = init_words(GAME_WORD_REGEX)
+
+    sorted_chars, word_dict, search_keys, relaxed_search_keys, rare_chars = (
+        init_search(all_words)
+    )
+    print(list(sorted_chars))
+
+    vowels = set("aeiou")
+    rare_words = {w for k, wl in word_dict.items() for w in wl if not set(k) & vowels}
+    print(rare_words)
+
+    print(len(search_keys))
     print(len(relaxed_search_keys))
 
     # for word0 in sorted(all_words):
     for word0 in sorted(relaxed_search_keys):
         print(word0)
-        if len(word0) == 4:
-            candidates: "list[str]" = get_candidates(
-                word_dict,
-                [w for w in search_keys if not set(w) & set(word0)],
-                "".join(
-                    c
-                    for c in string.ascii_lowercase
-                    if c not in rare_chars and c not in word0
-                ),
-            )
-        else:
-            assert len(word0) == 5
-            candidates = []
-            for i in range(5):
-                forbidden_chars = "".join(c for c in word0 if c != word0[i])
-                candidates.extend(
-                    get_candidates(
-                        word_dict,
-                        [w for w in search_keys if not set(w) & set(forbidden_chars)],
-                        "".join(
-                            c
-                            for c in string.ascii_lowercase
-                            if c not in rare_chars and c not in forbidden_chars
-                        ),
-                    ),
-                )
-
-        for candidate in candidates:
-            print(word_dict[word0], candidate)
+        for cover in search_covers(word_dict, search_keys, rare_chars, word0):
+            print(cover)
 
     # # for word0 in sorted(all_words):
     # for word0 in search_keys:
@@ -1,26 +1,13 @@
-import re
 import string
+from collections import defaultdict
 from enum import Enum
 from random import choice, random
 from sys import argv
+from time import monotonic
 from typing import Optional
 
-GAME_WORD_REGEX = r"^[a-z]{5}\n?$"
-
-
-def init_word_list(
-    regexp: str, nbr_uniq: "Optional[set[int]]" = None, file: str = "words.txt"
-) -> "set[str]":
-    output: "set[str]" = set()
-    with open(file, "r") as f:
-        for line in f:
-            if re.fullmatch(regexp, line.strip().lower()):
-                output.add(line.strip().lower())
-
-    if nbr_uniq is None:
-        return output
-
-    return {w for w in output if len(set(w)) in nbr_uniq}
+from corpus import GAME_WORD_REGEX, init_word_list
+from gamelog import KIND_WORDLE, decode_hint, log_game, pattern_code
 
 
 def is_valid(word: str, hint: str, guess: str) -> bool:
@@ -99,6 +86,82 @@ def choose_hint(words: "set[str]", guess: str, min_hints: int = 0) -> str:
     return best_hint
 
 
+def partition(words: "set[str]", guess: str) -> "dict[int, list[str]]":
+    buckets: "defaultdict[int, list[str]]" = defaultdict(list)
+    for w in words:
+        buckets[pattern_code(guess, w)].append(w)
+    return buckets
+
+
+def best_reply_score(words: "list[str]", guesses: "list[str]", deadline: float) -> int:
+    # size of the biggest bucket left by the best reply of the player
+    best_score = len(words)
+    for guess in guesses:
+        if best_score <= 1 or monotonic() > deadline:
+            break
+        counts: "defaultdict[int, int]" = defaultdict(int)
+        score = 0
+        for w in words:
+            code = pattern_code(guess, w)
+            counts[code] += 1
+            if counts[code] > score:
+                score = counts[code]
+                if score >= best_score:
+                    break
+        else:
+            best_score = score
+    return best_score
+
+
+lookahead_cache: "dict[frozenset[str], int]" = {}
+
+
+def choose_hint_lookahead(
+    words: "set[str]",
+    guess: str,
+    all_words: "set[str]",
+    budget: float = 0.8,
+    max_word_corpus: int = 200,
+    max_guess_corpus: int = 200,
+) -> str:
+    # keep the bucket where the best reply of the player leaves the most words
+    # the budget (in seconds) bounds the search, buckets that are not fully
+    # evaluated in time are ignored (the biggest ones are evaluated first)
+    deadline = monotonic() + budget
+    buckets = sorted(
+        partition(words - {guess}, guess).items(),
+        key=lambda kv: len(kv[1]),
+        reverse=True,
+    )
+    best_code = buckets[0][0]
+    best_value = (-1, 0)
+    for code, bucket in buckets:
+        # a reply cannot leave more words than the bucket
+        if len(bucket) <= best_value[0] or monotonic() > deadline:
+            break
+        key = frozenset(bucket)
+        if key not in lookahead_cache:
+            word_corpus = list(simplify(key, max_word_corpus / len(bucket)))
+            guess_corpus = list(
+                dict.fromkeys(
+                    word_corpus[: max_guess_corpus // 2]
+                    + list(simplify(all_words, max_guess_corpus / 2 / len(all_words)))
+                )
+            )
+            score = best_reply_score(word_corpus, guess_corpus, deadline)
+            score = score * len(bucket) // len(word_corpus)
+            if monotonic() > deadline:
+                # interrupted, the score is only an upper bound
+                break
+            if len(lookahead_cache) > 4096:
+                lookahead_cache.clear()
+            lookahead_cache[key] = score
+        value = (lookahead_cache[key], len(bucket))
+        if value > best_value:
+            best_code, best_value = code, value
+    return decode_hint(best_code, guess)
+
+
 def simplify(rem_words: "set[str]", ratio: float) -> "set[str]":
     output: "set[str]" = set()
     for w in rem_words:
@@ -118,7 +181,10 @@ def play(
     target_words: "set[str]",
     difficulty: Difficulty,
     max_len: int,
+    log_file: Optional[str] = None,
+    log_corpus: "Optional[list[str]]" = None,
 ):
+    # log_corpus: sorted corpus the logged words are indexed in (all_words)
     remaining_words = target_words
     guessed_letters: "set[str]" = set()
     eliminated_letters: "set[str]" = set()
@@ -128,6 +194,9 @@ def play(
 
     known_letters_pos: "list[set[str]]" = [set() for _ in range(max_len)]
 
+    # the target word is only known once found
+    game_rounds: "list[tuple[str,str,str]]" = []
+
     while True:
         guess = input(f"Guess {nbr_guesses}: ").strip()
         if guess not in all_words:
@@ -136,6 +205,7 @@ def play(
 
         nbr_guesses += 1
         if remaining_words == {guess}:
+            game_rounds.append((guess, guess, guess.upper()))
             print("You won!")
             break
 
@@ -144,9 +214,10 @@ def play(
         elif difficulty == Difficulty.NORMAL:
             hint = choose_hint(remaining_words, guess, choice([0, 1, 1, 2]))
         else:
-            hint = choose_hint(remaining_words, guess, 0)
+            hint = choose_hint_lookahead(remaining_words, guess, all_words)
 
         print(hint)
+        game_rounds.append((guess, "", hint))
         for i, c in enumerate(hint):
             untested_letters.discard(guess[i])
             if c == ".":
@@ -182,29 +253,39 @@ def play(
         # if len(remaining_words) < 5:
         #     print(remaining_words)
 
+    if log_file is not None:
+        if log_corpus is None:
+            log_corpus = sorted(all_words)
+        try:
+            log_game(log_file, log_corpus, KIND_WORDLE + difficulty.value, game_rounds)
+        except (OSError, ValueError) as e:
+            print(f"Game not logged in {log_file}: {e}")
+
 
 if __name__ == "__main__":
     diff = "NORMAL"
     if len(argv) > 1:
         diff = argv[1].upper()
 
+    # games are logged with indices in the whole corpus, whatever the difficulty
+    # the easy words and the target words are views of this corpus, not copies
+    all_words = init_word_list(GAME_WORD_REGEX)
+    log_corpus = sorted(all_words)
     if diff == "EASY":
         all_words = init_word_list(GAME_WORD_REGEX, {5})
-    else:
-        all_words = init_word_list(GAME_WORD_REGEX)
 
     if diff == "EASY":
-        words = simplify(all_words, 0.6)
+        words = all_words.sample(0.6)
         difficulty = Difficulty.EASY
     elif diff == "CURSED":
-        words = simplify(all_words, 0.6)
+        words = all_words.sample(0.6)
         difficulty = Difficulty.CURSED
     else:
-        words = simplify(all_words, 0.4)
+        words = all_words.sample(0.4)
         difficulty = Difficulty.NORMAL
 
     if diff != "CHEATS":
-        play(all_words, words, difficulty, 5)
+        play(all_words, words, difficulty, 5, "games.log", log_corpus)
     else:
 
         counts: "dict[str,int]" = {c: 0 for c in string.ascii_lowercase}